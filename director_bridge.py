@@ -3,29 +3,69 @@
 Socket.IO CLIENT that connects to the Director Engine (port 8002).
 
 Responsibilities:
-  - Forward incoming Twitch chat as `twitch_message` + `event` socket events
-  - Listen for `bot_reply` broadcast and hand it to a callback so the
-    Twitch client can post it back to chat
+  - Forward incoming Twitch chat as a single `twitch_chat` socket event
+    (`username`/`text` for UI display plus the scored-event fields)
+  - Listen for `bot_reply` and hand it to a callback so the Twitch client
+    can post it back to chat
+
+Contract with Director: on connect we emit `subscribe` with {"channel": TARGET_CHANNEL};
+Director joins our sid to the room `twitch:<channel>` and sends `bot_reply`
+to that room only, instead of broadcasting to every client.
 """
+import asyncio
+import logging
+import random
+import socket
 import socketio
-import threading
 import time
 from typing import Callable, Optional
 
-from config import DIRECTOR_URL, BOT_NAME
+try:
+    import orjson
+except ImportError:  # optional — python-socketio falls back to stdlib json
+    orjson = None
 
-sio = socketio.Client(
-    reconnection=True,
-    reconnection_attempts=0,
-    reconnection_delay=2,
-    reconnection_delay_max=10,
+from config import DIRECTOR_URL, TARGET_CHANNEL
+
+log = logging.getLogger("twitch_service")
+
+
+class _OrjsonCodec:
+    """json-module shim for python-socketio. dumps must return str, orjson gives bytes."""
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+
+# Built-in reconnection is off — _connect_loop owns reconnects (with jittered backoff)
+sio = socketio.AsyncClient(
+    reconnection=False,
     logger=False,
     engineio_logger=False,
+    # Passed through to aiohttp's ws_connect: negotiate permessage-deflate (15 = window bits)
+    websocket_extra_options={"compress": 15},
+    json=_OrjsonCodec if orjson else None,
 )
 
+# Full-jitter exponential backoff: wait = uniform(0, min(cap, base * 2**failures))
+_BACKOFF_BASE = 2
+_BACKOFF_CAP = 30
+# A connection must stay up this long before we stop counting it as a failure
+_STABLE_AFTER = 10
+
+# source_str values for twitch_chat events
+_SRC_MENTION = "TWITCH_MENTION"
+_SRC_CHAT = "TWITCH_CHAT"
+
 _on_bot_reply_cb: Optional[Callable] = None
 _is_running = False
-_connector_thread: Optional[threading.Thread] = None
+_connector_task: Optional[asyncio.Task] = None
+_ready_event: Optional[asyncio.Event] = None
 
 
 # ─────────────────────────────────────────────
@@ -33,24 +73,28 @@ _connector_thread: Optional[threading.Thread] = None
 # ─────────────────────────────────────────────
 
 @sio.event
-def connect():
+async def connect():
     print("[DirectorBridge] ✅ Connected to Director Engine")
+    _tune_socket()
+    await sio.emit("subscribe", {"channel": TARGET_CHANNEL})
+    if _ready_event:
+        _ready_event.set()
 
 
 @sio.event
-def connect_error(data):
+async def connect_error(data):
     print(f"[DirectorBridge] 🔥 Connection error: {data}")
 
 
 @sio.event
-def disconnect():
+async def disconnect():
     print("[DirectorBridge] 🔌 Disconnected from Director Engine")
 
 
 @sio.on("bot_reply")
-def on_bot_reply(data):
+async def on_bot_reply(data):
     """
-    Director broadcasts bot_reply to all connected clients.
+    Director sends bot_reply to our channel room (see `subscribe` in connect).
     We pick it up here and forward it to Twitch chat.
     """
     if _on_bot_reply_cb:
@@ -61,33 +105,72 @@ def on_bot_reply(data):
 # Connection management
 # ─────────────────────────────────────────────
 
-def _run_connector():
+def _tune_socket():
+    """
+    Disable Nagle (small JSON emits shouldn't wait on ACKs) and enable TCP keepalive
+    so a dead Director is noticed without relying on Engine.IO pings alone.
+    """
+    try:
+        sock = sio.eio.ws.get_extra_info("socket")
+        if sock is None:
+            return
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        # Linux-only knobs
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 15)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 4)
+    except Exception as e:
+        print(f"[DirectorBridge] ⚠️  Could not tune socket options: {e}")
+
+
+async def _backoff(failures: int) -> bool:
+    """Sleep a jittered delay for the given failure count. Returns False if stopped meanwhile."""
+    expo = min(_BACKOFF_CAP, _BACKOFF_BASE * (2 ** min(failures, 5)))
+    wait = random.uniform(0, expo)
+    print(f"[DirectorBridge] Retry in {wait:.1f}s")
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        if not _is_running:
+            return False
+        await asyncio.sleep(min(0.25, deadline - time.monotonic()))
+    return _is_running
+
+
+async def _connect_loop():
     global _is_running
     _is_running = True
     failures = 0
 
     while _is_running:
         if sio.connected:
-            time.sleep(1)
+            await asyncio.sleep(1)
             continue
 
         try:
             print(f"[DirectorBridge] Connecting to {DIRECTOR_URL}...")
-            sio.connect(DIRECTOR_URL, transports=["websocket", "polling"], wait_timeout=10)
-            failures = 0
+            await sio.connect(DIRECTOR_URL, transports=["websocket"], wait_timeout=10)
+            connected_at = time.monotonic()
             while _is_running and sio.connected:
-                time.sleep(1)
+                await asyncio.sleep(1)
+            if time.monotonic() - connected_at >= _STABLE_AFTER:
+                failures = 0
+            elif _is_running:
+                # Connected but dropped right away — treat as a failure so we don't hammer Director
+                failures += 1
+                if not await _backoff(failures):
+                    return
         except socketio.exceptions.ConnectionError as e:
             failures += 1
-            wait = min(5 * failures, 30)
-            print(f"[DirectorBridge] Connection failed ({failures}): {e} — retry in {wait}s")
-            for _ in range(wait * 2):
-                if not _is_running:
-                    return
-                time.sleep(0.5)
+            print(f"[DirectorBridge] Connection failed ({failures}): {e}")
+            if not await _backoff(failures):
+                return
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"[DirectorBridge] Unexpected error: {e}")
-            time.sleep(5)
+            await asyncio.sleep(5)
 
 
 # ─────────────────────────────────────────────
@@ -95,53 +178,57 @@ def _run_connector():
 # ─────────────────────────────────────────────
 
 def set_bot_reply_callback(cb: Callable):
-    """Called whenever Director broadcasts a bot_reply event."""
+    """Called whenever Director sends a bot_reply event to our twitch:<channel> room."""
     global _on_bot_reply_cb
     _on_bot_reply_cb = cb
 
 
 def start():
-    global _connector_thread
-    _connector_thread = threading.Thread(
-        target=_run_connector, daemon=True, name="DirectorBridge"
-    )
-    _connector_thread.start()
+    """Schedule the connect loop on the running event loop (call from the FastAPI lifespan)."""
+    global _connector_task, _ready_event
+    _ready_event = asyncio.Event()
+    _connector_task = asyncio.create_task(_connect_loop(), name="DirectorBridge")
 
 
-def stop():
-    global _is_running
-    _is_running = False
-    if sio.connected:
-        sio.disconnect()
+async def wait_ready():
+    """Wait until the first successful connection to Director. start() must have been called."""
+    await _ready_event.wait()
 
 
-def emit_twitch_message(username: str, message: str):
-    """Emit a raw chat message event — Director uses this for UI display."""
-    _safe_emit("twitch_message", {"username": username, "message": message})
+async def stop():
+    global _is_running, _connector_task
+    _is_running = False
+    if _connector_task:
+        _connector_task.cancel()
+        _connector_task = None
+    if sio.connected:
+        await sio.disconnect()
 
 
-def emit_scored_event(username: str, message: str, is_mention: bool):
+async def emit_chat(username: str, message: str, is_mention: bool):
     """
-    Emit a scored input event so Director / Nami can decide whether to reply.
+    Emit one `twitch_chat` event per chat line. Director uses `username`/`text`
+    for UI display and the scored fields to decide whether Nami should reply.
     """
-    _safe_emit("event", {
-        "source_str": "TWITCH_MENTION" if is_mention else "TWITCH_CHAT",
+    await _safe_emit("twitch_chat", {
+        "username": username,
         "text": message,
+        "is_mention": is_mention,
+        "source_str": _SRC_MENTION if is_mention else _SRC_CHAT,
         "metadata": {
             "username": username,
             "mentioned_bot": is_mention,
             "message_length": len(message),
             "relevance": 0.5,
         },
-        "username": username,
     })
 
 
-def _safe_emit(event: str, payload: dict):
+async def _safe_emit(event: str, payload: dict):
     try:
         if sio.connected:
-            sio.emit(event, payload)
+            await sio.emit(event, payload)
         else:
-            print(f"[DirectorBridge] ⚠️  Drop event '{event}' — not connected")
+            log.warning("[DirectorBridge] ⚠️  Drop event '%s' — not connected", event)
     except Exception as e:
-        print(f"[DirectorBridge] ❌ Emit error for '{event}': {e}")
\ No newline at end of file
+        log.error("[DirectorBridge] ❌ Emit error for '%s': %s", event, e)
\ No newline at end of file
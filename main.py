@@ -1,44 +1,96 @@
 # twitch_service/main.py
+import asyncio
+import logging
 import re
-import time
 import uvicorn
 from contextlib import asynccontextmanager
 from typing import Optional
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 import twitch_client
 import director_bridge
-from config import SERVICE_PORT, TARGET_CHANNEL, BOT_NAME
+from config import SERVICE_PORT
 
-_MENTION_RE = re.compile(r"(nami|peepingnami)", re.IGNORECASE)
+log = logging.getLogger("twitch_service")
+log.setLevel(logging.INFO)
+
+# "peepingnami" contains "nami", so one lowercase substring test covers both
+_MENTION_KEYWORD = "nami"
+
+_SFX_RE = re.compile(r"\*[A-Za-z]+\*")
+_WS_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"\s+([,.!?;:])")
+_SPACE_PUNCT = tuple(" " + p for p in ",.!?;:")
+
+# Twitch's chat message limit
+_CHAT_MAX_LEN = 500
+# Bot replies arriving within this window are joined into one chat line
+_REPLY_COALESCE_S = 0.1
+
+_pending_replies: list[str] = []
+_pending_len = 0
+_flush_handle: Optional[asyncio.TimerHandle] = None
 
 
 def _strip_sound_effects(text: str) -> str:
-    text = re.sub(r"\*[A-Za-z]+\*", "", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    text = re.sub(r"\s+([,.!?;:])", r"\1", text)
+    # Fast path: no sfx, no whitespace besides single spaces (isprintable rejects
+    # tabs/newlines/other separators) and no space before punctuation.
+    if (
+        "*" not in text
+        and "  " not in text
+        and text.isprintable()
+        and not any(gap in text for gap in _SPACE_PUNCT)
+    ):
+        return text.strip()
+    text = _SFX_RE.sub("", text)
+    text = _WS_RE.sub(" ", text).strip()
+    text = _PUNCT_RE.sub(r"\1", text)
     return text
 
 
 def _handle_bot_reply(data: dict):
+    global _pending_len, _flush_handle
     reply = data.get("reply", "")
     if not reply:
         return
     chat_msg = "*censored*" if data.get("is_censored") else _strip_sound_effects(reply)
-    if chat_msg:
-        twitch_client.send_message(chat_msg)
-        print(f"[Main] 📤 Forwarded bot_reply to Twitch: {chat_msg[:80]}")
+    if not chat_msg:
+        return
+
+    # Don't let the joined line overflow Twitch's limit — send what we have first
+    if _pending_replies and _pending_len + 1 + len(chat_msg) > _CHAT_MAX_LEN:
+        _flush_replies()
+    _pending_replies.append(chat_msg)
+    _pending_len += len(chat_msg) + (1 if _pending_len else 0)
+
+    if _pending_len >= _CHAT_MAX_LEN:
+        _flush_replies()
+    elif _flush_handle is None:
+        _flush_handle = asyncio.get_running_loop().call_later(_REPLY_COALESCE_S, _flush_replies)
+
+
+def _flush_replies():
+    global _pending_len, _flush_handle
+    if _flush_handle:
+        _flush_handle.cancel()
+        _flush_handle = None
+    if not _pending_replies:
+        return
+    chat_msg = " ".join(_pending_replies)
+    _pending_replies.clear()
+    _pending_len = 0
+    twitch_client.send_message(chat_msg)
+    log.debug("[Main] 📤 Forwarded bot_reply to Twitch: %.80s", chat_msg)
 
 
 async def _handle_twitch_message(msg):
     username = msg.user.name
     text = msg.text
-    is_mention = bool(_MENTION_RE.search(text))
-    director_bridge.emit_twitch_message(username, text)
-    director_bridge.emit_scored_event(username, text, is_mention)
+    is_mention = _MENTION_KEYWORD in text.lower()
+    await director_bridge.emit_chat(username, text, is_mention)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -51,16 +103,25 @@ async def lifespan(app: FastAPI):
     twitch_client.set_message_callback(_handle_twitch_message)
 
     director_bridge.start()
-    time.sleep(1)
+    try:
+        await asyncio.wait_for(director_bridge.wait_ready(), timeout=5)
+    except asyncio.TimeoutError:
+        print("[Main] ⚠️  Director not reachable yet — will keep retrying in background")
 
     if ok:
         twitch_client.start()
+        try:
+            await asyncio.wait_for(twitch_client.wait_ready(), timeout=5)
+        except asyncio.TimeoutError:
+            print("[Main] ⚠️  Twitch chat not ready yet — continuing startup")
 
     print(f"[Main] ✅ Twitch Service ready on :{SERVICE_PORT}")
     yield
 
+    _flush_replies()
+    await twitch_client.drain(timeout=2)
     twitch_client.stop()
-    director_bridge.stop()
+    await director_bridge.stop()
     print("[Main] 🛑 Twitch Service stopped")
 
 
@@ -74,13 +135,25 @@ async def health():
 
 
 class SendMessagePayload(BaseModel):
-    message: str
+    model_config = ConfigDict(frozen=True, strict=True)
+
+    message: str = Field(max_length=_CHAT_MAX_LEN)
     username: Optional[str] = None
 
+    @model_validator(mode="after")
+    def _fits_chat_limit(self):
+        # The "@username " prefix counts toward Twitch's limit too
+        if len(self.chat_line()) > _CHAT_MAX_LEN:
+            raise ValueError(f"message with @mention exceeds {_CHAT_MAX_LEN} characters")
+        return self
+
+    def chat_line(self) -> str:
+        return f"@{self.username} {self.message}" if self.username else self.message
+
 
 @app.post("/chat/send")
 async def send_chat_message(payload: SendMessagePayload):
-    msg = f"@{payload.username} {payload.message}" if payload.username else payload.message
+    msg = payload.chat_line()
     twitch_client.send_message(msg)
     return {"ok": True, "sent": msg}
 
@@ -119,5 +192,6 @@ async def create_redeem(payload: RedeemPayload):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(format="%(message)s")
     print("🎮 TWITCH SERVICE — Starting...")
     uvicorn.run(app, host="0.0.0.0", port=SERVICE_PORT, log_level="warning")
\ No newline at end of file
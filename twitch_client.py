@@ -1,7 +1,6 @@
 # twitch_service/twitch_client.py
 import asyncio
-import threading
-import time
+import logging
 from typing import Callable, Optional, Tuple
 
 from twitchAPI.twitch import Twitch
@@ -11,14 +10,25 @@ from twitchAPI.chat import Chat, EventData, ChatMessage
 
 from config import APP_ID, APP_SECRET, TARGET_CHANNEL, BOT_NAME
 
+log = logging.getLogger("twitch_service")
+
 USER_SCOPE = [AuthScope.CHAT_READ, AuthScope.CHAT_EDIT]
+# Max messages pulled off the queue per wakeup (Twitch rate-limits chat sends)
+_SEND_BATCH_MAX = 20
+# Outbound queue bound — when full we drop the oldest so chat stays current
+_SEND_QUEUE_MAX = 64
+# Folded once so _on_message only folds the sender's name
+_BOT_NAME_LC = BOT_NAME.casefold()
 
 _chat: Optional[Chat] = None
-_event_loop: Optional[asyncio.AbstractEventLoop] = None
+_chat_task: Optional[asyncio.Task] = None
 _message_queue: Optional[asyncio.Queue] = None
 _is_running = False
 _auth_tokens: Optional[Tuple[str, str]] = None
 
+# Set once we've joined the channel
+_ready_event: Optional[asyncio.Event] = None
+
 _on_message_cb: Optional[Callable] = None
 
 
@@ -48,7 +58,7 @@ async def authenticate() -> bool:
 
 
 # ─────────────────────────────────────────────
-# Step 2 — Chat loop  (background daemon thread)
+# Step 2 — Chat loop  (task on the service's event loop)
 # ─────────────────────────────────────────────
 
 def set_message_callback(cb: Callable):
@@ -59,10 +69,12 @@ def set_message_callback(cb: Callable):
 async def _on_ready(ready_event: EventData):
     print(f"[TwitchClient] ✅ Bot ready — joining #{TARGET_CHANNEL}")
     await ready_event.chat.join_room(TARGET_CHANNEL)
+    if _ready_event:
+        _ready_event.set()
 
 
 async def _on_message(msg: ChatMessage):
-    if msg.user.name.lower() == BOT_NAME.lower():
+    if msg.user.name.casefold() == _BOT_NAME_LC:
         return
     if _on_message_cb:
         await _on_message_cb(msg)
@@ -75,13 +87,23 @@ async def _sender_loop():
             message = await asyncio.wait_for(_message_queue.get(), timeout=1.0)
         except asyncio.TimeoutError:
             continue
-        if _chat:
+
+        # Drain whatever else is already queued so a burst goes out in one wakeup
+        batch = [message]
+        while len(batch) < _SEND_BATCH_MAX:
             try:
-                await _chat.send_message(TARGET_CHANNEL, message)
-                print(f"[TwitchClient] 📤 Sent: {message[:80]}")
-            except Exception as e:
-                print(f"[TwitchClient] ❌ Send error: {e}")
-        _message_queue.task_done()
+                batch.append(_message_queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+
+        for message in batch:
+            if _chat:
+                try:
+                    await _chat.send_message(TARGET_CHANNEL, message)
+                    log.debug("[TwitchClient] 📤 Sent: %.80s", message)
+                except Exception as e:
+                    log.error("[TwitchClient] ❌ Send error: %s", e)
+            _message_queue.task_done()
 
 
 async def _run():
@@ -91,27 +113,34 @@ async def _run():
         raise RuntimeError("authenticate() must be awaited before start()")
 
     token, refresh_token = _auth_tokens
-    _message_queue = asyncio.Queue()
 
     twitch = await Twitch(APP_ID, APP_SECRET)
     await twitch.set_user_authentication(token, USER_SCOPE, refresh_token)
     print("[TwitchClient] 🔑 Re-authenticated with stored tokens")
 
-    _chat = await Chat(twitch)
+    # twitchAPI runs its IRC socket on a private thread; without callback_loop our
+    # handlers would run there too instead of on the service loop
+    _chat = await Chat(twitch, callback_loop=asyncio.get_running_loop())
     _chat.register_event(ChatEvent.READY, _on_ready)
     _chat.register_event(ChatEvent.MESSAGE, _on_message)
-    _chat.start()
+    # start() blocks until IRC startup (incl. connect retries) finishes — keep it off-loop
+    await asyncio.to_thread(_chat.start)
+    # Only accept sends once chat is up, so send_message fails loudly until then
+    _message_queue = asyncio.Queue(maxsize=_SEND_QUEUE_MAX)
 
     print(f"[TwitchClient] 💬 Chat client started for #{TARGET_CHANNEL}")
     await _sender_loop()
 
 
-def _thread_target():
-    global _event_loop
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    _event_loop = loop
-    loop.run_until_complete(_run())
+def _on_chat_task_done(task: asyncio.Task):
+    """Surface a crashed chat loop right away and stop accepting sends."""
+    global _message_queue
+    _message_queue = None
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc:
+        log.error("[TwitchClient] ❌ Chat loop crashed: %s", exc, exc_info=exc)
 
 
 # ─────────────────────────────────────────────
@@ -119,26 +148,57 @@ def _thread_target():
 # ─────────────────────────────────────────────
 
 def start():
-    """Start the chat loop in a background thread. authenticate() must have been awaited first."""
-    global _is_running
+    """
+    Schedule the chat loop on the running event loop. authenticate() must have been awaited first.
+    Await wait_ready() to know when chat is joined.
+    """
+    global _is_running, _ready_event, _chat_task
     _is_running = True
-    t = threading.Thread(target=_thread_target, daemon=True, name="TwitchClient")
-    t.start()
-    time.sleep(1)
-    return t
+    _ready_event = asyncio.Event()
+    _chat_task = asyncio.create_task(_run(), name="TwitchClient")
+    _chat_task.add_done_callback(_on_chat_task_done)
+    return _chat_task
+
+
+async def wait_ready():
+    """Wait until the bot has joined the target channel. start() must have been called."""
+    await _ready_event.wait()
+
+
+async def drain(timeout: float):
+    """Wait (up to timeout seconds) for queued messages to be sent. Call before stop()."""
+    if not _message_queue or not _is_running:
+        return
+    try:
+        await asyncio.wait_for(_message_queue.join(), timeout=timeout)
+    except asyncio.TimeoutError:
+        log.warning("[TwitchClient] ⚠️  %d message(s) unsent at shutdown", _message_queue.qsize())
+
+
+def _enqueue(text: str):
+    """Drops the oldest queued message if the queue is full."""
+    try:
+        _message_queue.put_nowait(text)
+    except asyncio.QueueFull:
+        _message_queue.get_nowait()
+        _message_queue.task_done()
+        _message_queue.put_nowait(text)
+        log.warning("[TwitchClient] ⚠️  Queue full — dropped 1 stale message")
 
 
 def send_message(text: str):
-    global _event_loop, _message_queue
-    if _event_loop and _message_queue:
-        asyncio.run_coroutine_threadsafe(_message_queue.put(text), _event_loop)
+    if _message_queue:
+        _enqueue(text)
     else:
         print("[TwitchClient] ⚠️  Cannot send — client not ready yet")
 
 
 def stop():
-    global _is_running
+    global _is_running, _chat_task
     _is_running = False
     if _chat:
         _chat.stop()
+    if _chat_task:
+        _chat_task.cancel()
+        _chat_task = None
     print("[TwitchClient] 🛑 Stopped")
\ No newline at end of file